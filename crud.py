@@ -1,7 +1,8 @@
 from sqlalchemy.orm import Session
-from models import Usuario, UserRole, Producto, Movimiento
+from models import Usuario, UserRole, Producto, Movimiento, CambioSync, SecuenciaSync
 from auth import hash_password
 from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime
 
 # ---------- USUARIOS ----------
@@ -39,6 +40,53 @@ def actualizar_usuario(db: Session, usuario_id: int, nombre, email, rol, foto_ur
         db.refresh(usuario)
     return usuario
 
+# ---------- REGISTRO DE CAMBIOS ----------
+
+SECUENCIA_CAMBIOS = "cambios"
+
+def siguiente_version(db: Session):
+    # La fila del contador queda bloqueada (SELECT ... FOR UPDATE) hasta el commit, asi
+    # dos escrituras concurrentes no pueden confirmar sus versiones fuera de orden y
+    # la version nunca retrocede aunque se borren filas del registro.
+    seq = db.query(SecuenciaSync).filter(SecuenciaSync.nombre == SECUENCIA_CAMBIOS).with_for_update().one()
+    seq.valor += 1
+    return seq.valor
+
+def registrar_cambio(db: Session, entidad: str, entidad_id: str, operacion: str = "upsert"):
+    # Se guarda solo el ultimo cambio de cada entidad (se actualiza la fila en el lugar),
+    # asi la tabla queda compacta. Debe llamarse antes del commit para que el cambio
+    # quede en la misma transaccion que la escritura.
+    version = siguiente_version(db)
+    cambio = db.query(CambioSync).filter(
+        CambioSync.entidad == entidad,
+        CambioSync.entidad_id == entidad_id
+    ).with_for_update().first()
+    if cambio:
+        cambio.version = version
+        cambio.operacion = operacion
+    else:
+        db.add(CambioSync(entidad=entidad, entidad_id=entidad_id, version=version, operacion=operacion))
+
+def inicializar_sync(db: Session):
+    # Crea el contador la primera vez y carga un upsert por cada producto y movimiento
+    # existente, para que /sync?since=0 devuelva la base completa.
+    if db.query(SecuenciaSync).filter(SecuenciaSync.nombre == SECUENCIA_CAMBIOS).first():
+        return
+    version = 0
+    for (product_id,) in db.query(Producto.product_id).order_by(Producto.product_id).all():
+        version += 1
+        db.add(CambioSync(entidad="producto", entidad_id=product_id, version=version, operacion="upsert"))
+    movimientos = db.query(Movimiento.movement_id).filter(Movimiento.product_id.isnot(None)).order_by(Movimiento.movement_id).all()
+    for (movement_id,) in movimientos:
+        version += 1
+        db.add(CambioSync(entidad="movimiento", entidad_id=movement_id, version=version, operacion="upsert"))
+    db.add(SecuenciaSync(nombre=SECUENCIA_CAMBIOS, valor=version))
+    try:
+        db.commit()
+    except IntegrityError:
+        # Otro proceso ya lo inicializo
+        db.rollback()
+
 # ---------- PRODUCTOS ----------
 
 def generar_product_id(db: Session):
@@ -63,6 +111,7 @@ def crear_producto(db: Session, product_id, product_name, sku, unit_of_measure,
         foto=foto
     )
     db.add(prod)
+    registrar_cambio(db, "producto", product_id)
     db.commit()
     db.refresh(prod)
     return prod
@@ -85,6 +134,7 @@ def actualizar_producto(db: Session, product_id, product_name, sku, unit_of_meas
         prod.location = location
         prod.active = active
         prod.foto = foto_url
+        registrar_cambio(db, "producto", product_id)
         db.commit()
         db.refresh(prod)
     return prod
@@ -92,7 +142,13 @@ def actualizar_producto(db: Session, product_id, product_name, sku, unit_of_meas
 def eliminar_producto(db: Session, product_id: str):
     prod = db.query(Producto).filter(Producto.product_id == product_id).first()
     if prod:
+        # Los movimientos del producto se eliminan con el y quedan como tombstones,
+        # en vez de quedar huerfanos (product_id = NULL) fuera del registro de cambios
+        for mov in prod.movimientos:
+            registrar_cambio(db, "movimiento", mov.movement_id, "delete")
+            db.delete(mov)
         db.delete(prod)
+        registrar_cambio(db, "producto", product_id, "delete")
         db.commit()
         return True
     return False
@@ -142,6 +198,9 @@ def crear_movimiento(db, product_id, tipo, cantidad, descripcion):
         notes=descripcion,
     )
     db.add(mov)
+    registrar_cambio(db, "movimiento", movement_id)
+    # El stock del producto cambia con cada movimiento
+    registrar_cambio(db, "producto", product_id)
     db.commit()
     db.refresh(mov)
     return mov
@@ -151,3 +210,38 @@ def listar_movimientos(db, product_id=None):
     if product_id:
         q = q.filter(Movimiento.product_id == product_id)
     return q.order_by(Movimiento.date.desc()).all()
+
+# ---------- SINCRONIZACION ----------
+
+def listar_cambios_desde(db: Session, since: int):
+    # Devuelve los upserts y tombstones con version > since, y la version actual del
+    # servidor. Si since es mayor que la version actual (base restaurada o reiniciada),
+    # el cliente recibe una version menor a la suya y debe resincronizar desde 0.
+    version = db.query(SecuenciaSync.valor).filter(SecuenciaSync.nombre == SECUENCIA_CAMBIOS).scalar() or 0
+    cambios = db.query(CambioSync).filter(
+        CambioSync.version > since,
+        CambioSync.version <= version
+    ).order_by(CambioSync.version).all()
+
+    ids_productos = [c.entidad_id for c in cambios if c.entidad == "producto" and c.operacion == "upsert"]
+    ids_movimientos = [c.entidad_id for c in cambios if c.entidad == "movimiento" and c.operacion == "upsert"]
+    eliminados = [{"entidad": c.entidad, "id": c.entidad_id} for c in cambios if c.operacion == "delete"]
+
+    productos = []
+    if ids_productos:
+        for prod in db.query(Producto).filter(Producto.product_id.in_(ids_productos)).all():
+            prod_dict = prod.__dict__.copy()
+            prod_dict['stock'] = calcular_stock(db, prod.product_id)
+            prod_dict.pop('_sa_instance_state', None)
+            productos.append(prod_dict)
+
+    movimientos = []
+    if ids_movimientos:
+        movimientos = db.query(Movimiento).filter(Movimiento.movement_id.in_(ids_movimientos)).all()
+
+    return {
+        "version": version,
+        "productos": productos,
+        "movimientos": movimientos,
+        "eliminados": eliminados,
+    }
@@ -14,6 +14,10 @@ from datetime import datetime, timedelta
 # Crear las tablas si no existen
 Base.metadata.create_all(bind=engine)
 
+# Inicializar el registro de cambios para /sync (carga los datos existentes)
+with SessionLocal() as db:
+    crud.inicializar_sync(db)
+
 app = FastAPI()
 
 app.add_middleware(
@@ -292,6 +296,19 @@ def listar_movimientos(
         raise HTTPException(status_code=401, detail="Token inválido")
     return crud.listar_movimientos(db, product_id)
 
+# ========== SINCRONIZACION INCREMENTAL ==========
+
+@app.get("/sync", response_model=schemas.SyncOut)
+def sincronizar(
+    since: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    token: str = Depends(oauth2_scheme)
+):
+    payload = auth.decodificar_token(token)
+    if not payload:
+        raise HTTPException(status_code=401, detail="Token inválido")
+    return crud.listar_cambios_desde(db, since)
+
 # ========== PREDICCION DE STOCK ==========
 
 @app.get("/prediccion_stock")
@@ -46,3 +46,19 @@ class Movimiento(Base):
     order_id = Column(String(20))
     notes = Column(Text)
     producto = relationship("Producto", back_populates="movimientos")
+
+# --- Registro de cambios para sincronizacion incremental ---
+# Una fila por entidad con la version de su ultimo cambio ("upsert" o "delete").
+class CambioSync(Base):
+    __tablename__ = "cambios_sync"
+    entidad = Column(String(20), primary_key=True)   # "producto" o "movimiento"
+    entidad_id = Column(String(10), primary_key=True)
+    version = Column(Integer, nullable=False, index=True)
+    operacion = Column(String(10), nullable=False)   # "upsert" o "delete"
+    fecha = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+# --- Contador de versiones (una sola fila, se bloquea con SELECT ... FOR UPDATE) ---
+class SecuenciaSync(Base):
+    __tablename__ = "secuencia_sync"
+    nombre = Column(String(20), primary_key=True)
+    valor = Column(Integer, nullable=False, default=0)
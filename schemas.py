@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import Optional, List
 from decimal import Decimal
 from datetime import datetime
 import enum
@@ -69,3 +69,17 @@ class MovimientoOut(BaseModel):
 
     class Config:
         orm_mode = True
+
+# ----------- SINCRONIZACION -----------
+class ProductoSyncOut(ProductoOut):
+    stock: int = 0
+
+class EliminadoOut(BaseModel):
+    entidad: str   # "producto" o "movimiento"
+    id: str
+
+class SyncOut(BaseModel):
+    version: int
+    productos: List[ProductoSyncOut] = []
+    movimientos: List[MovimientoOut] = []
+    eliminados: List[EliminadoOut] = []
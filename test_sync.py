@@ -0,0 +1,95 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+import pytest
+from datetime import datetime
+
+import crud, schemas
+from database import Base
+from models import Producto, Movimiento, CambioSync
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    crud.inicializar_sync(session)
+    yield session
+    session.close()
+
+def crear(db, product_id):
+    return crud.crear_producto(db, product_id, f"Producto {product_id}", "", "u", 1, 2, "", "", "Yes", None)
+
+def sync(db, since):
+    # Igual que la respuesta del endpoint /sync
+    return schemas.SyncOut.model_validate(crud.listar_cambios_desde(db, since), from_attributes=True)
+
+def test_alta_y_modificacion(db):
+    crear(db, "P001")
+    r = sync(db, 0)
+    assert r.version == 1
+    assert [p.product_id for p in r.productos] == ["P001"]
+
+    crud.actualizar_producto(db, "P001", "Nuevo nombre", "", "u", 1, 2, "", "", "Yes", None)
+    r = sync(db, 1)
+    assert r.version == 2
+    assert [p.product_name for p in r.productos] == ["Nuevo nombre"]
+    assert sync(db, 2).productos == []
+
+def test_movimiento_actualiza_stock_del_producto(db):
+    crear(db, "P001")
+    crear(db, "P002")
+    version = sync(db, 0).version
+    crud.crear_movimiento(db, "P001", "Ingreso", 5, "Compra")
+    r = sync(db, version)
+    assert [m.movement_id for m in r.movimientos] == ["M001"]
+    assert [(p.product_id, p.stock) for p in r.productos] == [("P001", 5)]
+
+def test_eliminar_producto_deja_tombstones_de_sus_movimientos(db):
+    crear(db, "P001")
+    crud.crear_movimiento(db, "P001", "Ingreso", 5, "Compra")
+    crud.crear_movimiento(db, "P001", "Egreso", 2, "Venta")
+    version = sync(db, 0).version
+    assert crud.eliminar_producto(db, "P001")
+    assert db.query(Movimiento).count() == 0
+
+    r = sync(db, version)
+    assert r.version > version
+    assert r.productos == [] and r.movimientos == []
+    assert {(e.entidad, e.id) for e in r.eliminados} == {
+        ("producto", "P001"), ("movimiento", "M001"), ("movimiento", "M002")
+    }
+    # Un cliente nuevo tambien recibe los tombstones sin romper la respuesta
+    assert len(sync(db, 0).eliminados) == 3
+
+def test_la_version_no_retrocede_al_eliminar(db):
+    crear(db, "P001")
+    crear(db, "P002")
+    crear(db, "P003")
+    crud.eliminar_producto(db, "P003")
+    r = sync(db, 3)
+    assert r.version == 4
+    assert [(e.entidad, e.id) for e in r.eliminados] == [("producto", "P003")]
+    # El registro guarda una sola fila por entidad
+    assert db.query(CambioSync).count() == 3
+
+def test_since_mayor_que_la_version_actual(db):
+    crear(db, "P001")
+    r = sync(db, 50)
+    assert r.version == 1
+    assert r.productos == [] and r.eliminados == []
+
+def test_inicializar_sync_carga_datos_existentes():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    db.add(Producto(product_id="P001", product_name="Existente"))
+    db.add(Movimiento(movement_id="M001", date=datetime.now(), product_id="P001", movement_type="Ingreso", quantity=3))
+    db.commit()
+
+    crud.inicializar_sync(db)
+    crud.inicializar_sync(db)  # idempotente
+    r = sync(db, 0)
+    assert r.version == 2
+    assert [(p.product_id, p.stock) for p in r.productos] == [("P001", 3)]
+    assert [m.movement_id for m in r.movimientos] == ["M001"]
+    db.close()